@@ -4,9 +4,11 @@ import gradio as gr
 import pandas as pd
 import plotly.graph_objects as go
 import requests # To make API calls
+from requests.adapters import HTTPAdapter, Retry
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -16,14 +18,34 @@ db = db_manager
 # We need the GROQ key here as well for the root cause analysis
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# Pool for fanning out independent per-category fetches
+_pool = ThreadPoolExecutor(max_workers=8)
+
+# Shared HTTP session so Groq/notify calls reuse connections instead of paying
+# a fresh TCP+TLS handshake every time
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.3)))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# User notifications happen off the agent's critical path: submit them to a
+# small pool and only log failures, so the UI never waits on the bot API
+_notify_pool = ThreadPoolExecutor(max_workers=4)
+
+def _fire_and_forget(fn, *args, **kwargs):
+    def _log_failure(future):
+        if future.exception(): print(f"Could not notify user: {future.exception()}")
+    _notify_pool.submit(fn, *args, **kwargs).add_done_callback(_log_failure)
+
 # --- LLM function for Root Cause Analysis ---
-def get_llm_root_cause(summaries: str) -> str:
+def stream_llm_root_cause(summaries: str):
+    """Stream the analysis token by token so the UI updates as Groq generates."""
     if not GROQ_API_KEY:
-        return "Error: GROQ_API_KEY not configured."
-        
+        yield "Error: GROQ_API_KEY not configured."
+        return
+
     url = "https://api.groq.com/openai/v1/chat/completions"
     headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-    
+
     prompt = f"""
     Based on the following list of customer support ticket summaries, what is the likely single root cause or common theme?
     Provide a concise, one-paragraph analysis written for a business manager. Focus on the core problem.
@@ -31,29 +53,75 @@ def get_llm_root_cause(summaries: str) -> str:
     Summaries:
     - {summaries}
     """
-    data = {"model": "llama3-70b-8192", "messages": [{"role": "user", "content": prompt}], "temperature": 0.5}
-    
+    data = {"model": "llama3-70b-8192", "messages": [{"role": "user", "content": prompt}], "temperature": 0.5, "stream": True}
+
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        response = _session.post(url, headers=headers, json=data, timeout=60, stream=True)
         response.raise_for_status()
-        return response.json()['choices'][0]['message']['content']
+        analysis = ""
+        for line in response.iter_lines():
+            if not line or not line.startswith(b"data: "): continue
+            payload = line[len(b"data: "):]
+            if payload == b"[DONE]": break
+            delta = json.loads(payload)['choices'][0].get('delta', {})
+            if delta.get('content'):
+                analysis += delta['content']
+                yield analysis
     except Exception as e:
-        return f"Error analyzing root cause: {e}"
+        yield f"Error analyzing root cause: {e}"
 
-# (Data fetching and charting functions)
-def get_stats_data():
-    stats = db.get_ticket_stats()
-    return stats['total'], stats['open'], stats['resolved'], stats['forwarded']
+def get_llm_root_cause_multi(payloads: dict) -> dict:
+    """Analyze every category's summaries in a single Groq round trip."""
+    if not GROQ_API_KEY:
+        return {category: "Error: GROQ_API_KEY not configured." for category in payloads}
 
-def get_category_pie_chart():
-    data = db.get_category_distribution()
+    url = "https://api.groq.com/openai/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
+
+    sections = "\n\n".join(f"### {category}\n- " + "\n- ".join(summaries) for category, summaries in payloads.items())
+    prompt = f"""
+    For each category of customer support ticket summaries below, identify the likely single root cause or common theme.
+    Be terse: one short paragraph per category, written for a business manager.
+    Return a JSON object mapping each category name to its analysis.
+
+    {sections}
+    """
+    data = {"model": "llama3-70b-8192", "messages": [{"role": "user", "content": prompt}], "temperature": 0.5, "response_format": {"type": "json_object"}}
+
+    try:
+        response = _session.post(url, headers=headers, json=data, timeout=90)
+        response.raise_for_status()
+        return json.loads(response.json()['choices'][0]['message']['content'])
+    except Exception as e:
+        return {category: f"Error analyzing root cause: {e}" for category in payloads}
+
+# (Charting functions - pure formatters over data from the dashboard snapshot)
+# Figures are pure functions of their inputs, so keep the last one per chart
+# keyed by its data and skip the rebuild (and Plotly's JSON serialization)
+# when a refresh produces identical numbers.
+_figure_cache = {}
+
+def _cached_figure(chart, key, builder):
+    cached = _figure_cache.get(chart)
+    if cached and cached[0] == key:
+        return cached[1]
+    fig = builder()
+    _figure_cache[chart] = (key, fig)
+    return fig
+
+def get_category_pie_chart(data):
+    return _cached_figure('category', tuple(sorted(data.items())), lambda: _build_category_pie_chart(data))
+
+def _build_category_pie_chart(data):
     if not data: return go.Figure().update_layout(title_text="No Category Data Available", template="plotly_dark")
     fig = go.Figure(data=[go.Pie(labels=list(data.keys()), values=list(data.values()), hole=.4, pull=[0.05] * len(data.keys()), marker=dict(colors=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']), textinfo='percent+label')])
-    fig.update_layout(title_text='📊 Category Distribution', font=dict(family="Arial, sans-serif"), showlegend=False, template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="white")
+    fig.update_layout(title_text='📊 Category Distribution', uirevision='constant', font=dict(family="Arial, sans-serif"), showlegend=False, template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="white")
     return fig
 
-def get_priority_bar_chart():
-    data = db.get_priority_distribution()
+def get_priority_bar_chart(data):
+    return _cached_figure('priority', tuple(sorted(data.items())), lambda: _build_priority_bar_chart(data))
+
+def _build_priority_bar_chart(data):
     if not data: return go.Figure().update_layout(title_text="No Priority Data Available", template="plotly_dark")
     color_map = {'High': '#d62728', 'Medium': '#ff7f0e', 'Low': '#2ca02c'}
     priority_order = ['High', 'Medium', 'Low']
@@ -61,45 +129,46 @@ def get_priority_bar_chart():
     values = [data[p] for p in labels]
     bar_colors = [color_map.get(p) for p in labels]
     fig = go.Figure(data=[go.Bar(x=labels, y=values, marker_color=bar_colors, text=values, textposition='auto')])
-    fig.update_layout(title_text='📈 Priority Breakdown', xaxis_title=None, yaxis_title="Ticket Count", template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="white")
+    fig.update_layout(title_text='📈 Priority Breakdown', uirevision='constant', xaxis_title=None, yaxis_title="Ticket Count", template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="white")
     return fig
 
-def get_ticket_volume_chart(timeframe_days=7):
-    end_date, start_date = datetime.now(), datetime.now() - timedelta(days=timeframe_days)
-    tickets = db.get_tickets_by_date_range(start_date.isoformat(), end_date.isoformat())
-    if not tickets: return go.Figure().update_layout(title_text=f"No Ticket Data for Last {timeframe_days} Days", template="plotly_dark")
-    df = pd.DataFrame(tickets)
-    df['created_at'] = pd.to_datetime(df['created_at'])
-    daily_counts = df.set_index('created_at').resample('D').size().reset_index(name='count')
-    date_range = pd.date_range(start=start_date.date(), end=end_date.date())
-    daily_counts = daily_counts.set_index('created_at').reindex(date_range, fill_value=0).reset_index().rename(columns={'index': 'date'})
-    fig = go.Figure(data=go.Scatter(x=daily_counts['date'], y=daily_counts['count'], mode='lines+markers', fill='tozeroy', line=dict(color='#1f77b4', width=2), marker=dict(size=8)))
-    fig.update_layout(title_text=f'📅 Ticket Volume (Last {timeframe_days} Days)', xaxis_title='Date', yaxis_title='New Tickets', template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="white")
+def build_ticket_volume_chart(daily_volume, timeframe_days=7):
+    key = (timeframe_days, tuple((d['day'], d['count']) for d in daily_volume))
+    return _cached_figure('volume', key, lambda: _build_ticket_volume_chart(daily_volume, timeframe_days))
+
+def _build_ticket_volume_chart(daily_volume, timeframe_days):
+    if not daily_volume: return go.Figure().update_layout(title_text=f"No Ticket Data for Last {timeframe_days} Days", template="plotly_dark")
+    fig = go.Figure(data=go.Scatter(x=[d['day'] for d in daily_volume], y=[d['count'] for d in daily_volume], mode='lines+markers', fill='tozeroy', line=dict(color='#1f77b4', width=2), marker=dict(size=8)))
+    fig.update_layout(title_text=f'📅 Ticket Volume (Last {timeframe_days} Days)', uirevision=f'volume-{timeframe_days}', xaxis_title='Date', yaxis_title='New Tickets', template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="white")
     return fig
 
+def get_ticket_volume_chart(timeframe_days=7):
+    days = int(str(timeframe_days).split()[0])  # the timeframe radio passes "7 Days"/"30 Days"
+    return build_ticket_volume_chart(db.get_ticket_daily_counts(days), days)
+
 # --- THE FIX IS IN THIS FUNCTION ---
-def format_recent_activity():
-    activities = db.get_recent_activity(limit=10)
+def format_recent_activity(activities):
     if not activities:
         return "No recent activity."
         
-    feed = ""
-    # The corrected dictionary
     status_icons = {"open": "🟡", "resolved": "✅", "forwarded": "🔄"}
-    
-    for act in activities:
-        # Correctly using the dictionary here
-        icon = status_icons.get(act.get('status'), '🆕') 
-        timestamp = pd.to_datetime(act.get('created_at')).strftime('%b %d, %H:%M')
-        feed += f"**{icon} {act.get('id')}** ({act.get('status', 'N/A').title()}) created by *{act.get('username', 'N/A')}* at {timestamp}\n---\n"
-    return feed
+    # Parse every timestamp in one vectorized call and join once at the end
+    # rather than reallocating the feed string per entry
+    timestamps = pd.to_datetime([act.get('created_at') for act in activities]).strftime('%b %d, %H:%M')
+    parts = [f"**{status_icons.get(act.get('status'), '🆕')} {act.get('id')}** ({act.get('status', 'N/A').title()}) created by *{act.get('username', 'N/A')}* at {timestamp}" for act, timestamp in zip(activities, timestamps)]
+    return "\n---\n".join(parts) + "\n---\n"
+
+def build_ticket_table(tickets):
+    if not tickets: return pd.DataFrame(columns=['ID', 'Status', 'Priority', 'Category', 'Username', 'Summary'])
+    df = pd.DataFrame.from_records(tickets, columns=['id', 'status', 'priority', 'category', 'username', 'summary']).fillna('N/A')
+    df['status'] = df['status'].str.title()
+    df.columns = ['ID', 'Status', 'Priority', 'Category', 'Username', 'Summary']
+    return df
 
 def get_filtered_tickets(status_filter, search_term):
     if search_term: tickets = db.search_tickets(search_term)
     else: tickets = db.get_all_tickets(status=status_filter if status_filter.lower() != "all" else None, limit=200)
-    if not tickets: return pd.DataFrame(columns=['ID', 'Status', 'Priority', 'Category', 'Username', 'Summary']), []
-    display_data = [{'ID': t.get('id'), 'Status': t.get('status', 'N/A').title(), 'Priority': t.get('priority', 'N/A'), 'Category': t.get('category', 'N/A'), 'Username': t.get('username', 'N/A'), 'Summary': t.get('summary', 'N/A')} for t in tickets]
-    return pd.DataFrame(display_data), tickets
+    return build_ticket_table(tickets), tickets
 
 # --- Gradio UI Definition ---
 with gr.Blocks(theme=gr.themes.Base(primary_hue="blue"), title="HelpHub AI Dashboard") as dashboard:
@@ -127,6 +196,7 @@ with gr.Blocks(theme=gr.themes.Base(primary_hue="blue"), title="HelpHub AI Dashb
                 with gr.Row():
                     analysis_category = gr.Dropdown(choices=db.get_all_categories(), label="Select Category to Analyze", interactive=True)
                     analyze_button = gr.Button("Analyze", variant="primary")
+                    analyze_all_button = gr.Button("Analyze All Categories", variant="secondary")
                 analysis_result = gr.Markdown("Select a category and click 'Analyze' to see AI-powered insights.", visible=True)
         with gr.TabItem("🎟️ Ticket Management", id=1):
             with gr.Row():
@@ -152,14 +222,31 @@ with gr.Blocks(theme=gr.themes.Base(primary_hue="blue"), title="HelpHub AI Dashb
 
     # Event Handlers
     def load_all_data():
-        total, open_t, resolved, forwarded = get_stats_data()
-        kpi_buttons = [f"🟡 Open\n{open_t}", f"✅ Resolved\n{resolved}", f"🔄 Forwarded\n{forwarded}", f"🎫 Total\n{total}"]
-        df, raw_tickets = get_filtered_tickets("all", "")
-        return *kpi_buttons, get_category_pie_chart(), get_priority_bar_chart(), get_ticket_volume_chart(7), format_recent_activity(), df, raw_tickets
+        snapshot = db.get_dashboard_snapshot(days=7)
+        stats = snapshot.get("stats", {})
+        kpi_buttons = [f"🟡 Open\n{stats.get('open', 0)}", f"✅ Resolved\n{stats.get('resolved', 0)}", f"🔄 Forwarded\n{stats.get('forwarded', 0)}", f"🎫 Total\n{stats.get('total', 0)}"]
+        recent = snapshot.get("recent", [])
+        return *kpi_buttons, get_category_pie_chart(snapshot.get("by_category", {})), get_priority_bar_chart(snapshot.get("by_priority", {})), build_ticket_volume_chart(snapshot.get("daily_volume", []), 7), format_recent_activity(recent[:10])
     
+    def refresh_all_data():
+        db.invalidate_cache()
+        return load_all_data()
+
+    # The ticket table is only visible on Tab 1, so build it when the user
+    # actually goes there; a short TTL keeps tab flips from refetching.
+    _ticket_tab_cache = {"ts": 0.0, "df": None, "raw": []}
+
+    def load_ticket_tab(evt: gr.SelectData):
+        if evt.index != 1: return gr.update(), gr.update()
+        if _ticket_tab_cache["df"] is not None and time.time() - _ticket_tab_cache["ts"] < 30:
+            return _ticket_tab_cache["df"], _ticket_tab_cache["raw"]
+        df, raw_tickets = get_filtered_tickets("all", "")
+        _ticket_tab_cache.update(ts=time.time(), df=df, raw=raw_tickets)
+        return df, raw_tickets
+
     def refresh_ticket_list(status, search):
         df, raw_tickets = get_filtered_tickets(status, search); return df, raw_tickets
-    
+
     def filter_by_kpi(status):
         df, raw_tickets = get_filtered_tickets(status, ""); return {ticket_df: df, raw_tickets_state: raw_tickets, status_filter: gr.Dropdown(value=status), tabs: gr.Tabs(selected=1)}
 
@@ -175,8 +262,7 @@ with gr.Blocks(theme=gr.themes.Base(primary_hue="blue"), title="HelpHub AI Dashb
         db.update_ticket_status(ticket_id, new_status, resolution)
         if assigned_to: db.assign_ticket(ticket_id, assigned_to)
         if new_status == "resolved" and resolution and ticket.get('user_id'):
-            try: requests.post("http://127.0.0.1:8000/notify_user", json={"user_id": ticket.get('user_id'), "message": f"✅ Your ticket **{ticket_id}** has been resolved!\n\n**Agent Note:**\n_{resolution}_"}, timeout=5)
-            except requests.exceptions.RequestException as e: print(f"Could not notify user: {e}")
+            _fire_and_forget(_session.post, "http://127.0.0.1:8000/notify_user", json={"user_id": ticket.get('user_id'), "message": f"✅ Your ticket **{ticket_id}** has been resolved!\n\n**Agent Note:**\n_{resolution}_"}, timeout=5)
         df, raw_tickets = get_filtered_tickets(current_status_filter, current_search)
         return {update_feedback: gr.Markdown("✅ Ticket updated successfully!"), ticket_df: df, raw_tickets_state: raw_tickets}
     
@@ -184,13 +270,26 @@ with gr.Blocks(theme=gr.themes.Base(primary_hue="blue"), title="HelpHub AI Dashb
         if not category: yield "Please select a category first."; return
         yield "🧠 Analyzing summaries... please wait."; summaries = db.get_summaries_by_category(category)
         if len(summaries) < 3: yield f"Not enough data. Need at least 3 tickets in '{category}' to analyze."; return
-        yield get_llm_root_cause("\n- ".join(summaries))
+        for partial in stream_llm_root_cause("\n- ".join(summaries)): yield partial
+
+    def perform_root_cause_analysis_all():
+        yield "🧠 Analyzing all categories... please wait."
+        categories = db.get_all_categories()
+        if not categories: yield "No categories to analyze."; return
+        all_summaries = zip(categories, _pool.map(db.get_summaries_by_category, categories))
+        payloads = {category: summaries for category, summaries in all_summaries if len(summaries) >= 3}
+        if not payloads: yield "Not enough data. Need at least 3 tickets in a category to analyze."; return
+        analyses = get_llm_root_cause_multi(payloads)
+        yield "\n\n".join(f"### {category}\n{analyses.get(category, 'No analysis returned.')}" for category in payloads)
 
     # Connect components
-    dashboard.load(load_all_data, outputs=[open_kpi, resolved_kpi, forwarded_kpi, total_kpi, category_chart, priority_chart, ticket_volume_chart, activity_feed, ticket_df, raw_tickets_state])
-    refresh_button.click(load_all_data, outputs=[open_kpi, resolved_kpi, forwarded_kpi, total_kpi, category_chart, priority_chart, ticket_volume_chart, activity_feed, ticket_df, raw_tickets_state])
+    dashboard.load(load_all_data, outputs=[open_kpi, resolved_kpi, forwarded_kpi, total_kpi, category_chart, priority_chart, ticket_volume_chart, activity_feed])
+    refresh_button.click(refresh_all_data, outputs=[open_kpi, resolved_kpi, forwarded_kpi, total_kpi, category_chart, priority_chart, ticket_volume_chart, activity_feed])
+    tabs.select(load_ticket_tab, outputs=[ticket_df, raw_tickets_state])
     status_filter.change(refresh_ticket_list, inputs=[status_filter, search_box], outputs=[ticket_df, raw_tickets_state])
-    search_box.submit(refresh_ticket_list, inputs=[status_filter, search_box], outputs=[ticket_df, raw_tickets_state])
+    # Rapid Enter presses in the search box fire one DB query each; let Gradio's
+    # queue drop all but the newest pending submit
+    search_box.submit(refresh_ticket_list, inputs=[status_filter, search_box], outputs=[ticket_df, raw_tickets_state], trigger_mode="always_last")
     timeframe_selector.change(get_ticket_volume_chart, inputs=timeframe_selector, outputs=ticket_volume_chart)
     open_kpi.click(lambda: filter_by_kpi("open"), outputs=[ticket_df, raw_tickets_state, status_filter, tabs])
     resolved_kpi.click(lambda: filter_by_kpi("resolved"), outputs=[ticket_df, raw_tickets_state, status_filter, tabs])
@@ -199,6 +298,7 @@ with gr.Blocks(theme=gr.themes.Base(primary_hue="blue"), title="HelpHub AI Dashb
     ticket_df.select(show_ticket_details, inputs=[raw_tickets_state], outputs=[detail_view, selected_ticket_id, issue_text, username_text, created_at_text, summary_text, update_status_radio, assigned_to_text, resolution_text, update_feedback])
     update_button.click(update_ticket_action, inputs=[selected_ticket_id, update_status_radio, resolution_text, assigned_to_text, status_filter, search_box], outputs=[update_feedback, ticket_df, raw_tickets_state])
     analyze_button.click(perform_root_cause_analysis, inputs=[analysis_category], outputs=[analysis_result])
+    analyze_all_button.click(perform_root_cause_analysis_all, outputs=[analysis_result])
 
 # Launch the Dashboard
 if __name__ == "__main__":
@@ -3,8 +3,16 @@
 import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+import bisect
+import itertools
 import logging
 import random
+import threading
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -18,15 +26,41 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Aggregations change on the order of minutes; a short TTL spares Supabase a
+# full-table scan on every refresh click while mutations bust stale entries.
+# The snapshot fallback and Gradio's handler threads hit this cache
+# concurrently and cachetools caches are not thread-safe on their own
+_stats_cache = TTLCache(maxsize=16, ttl=30)
+_stats_cache_lock = threading.Lock()
+
+# Timestamps alone collide under burst load (batched inserts land within the
+# same second/millisecond); a process-wide counter keeps ids unique
+_ticket_seq = itertools.count()
+
+def _new_ticket_id(now: datetime) -> str:
+    return f"TK-{int(now.timestamp())}-{next(_ticket_seq)}"
+
+# Pool for fanning out independent queries; sized for the snapshot fallback's
+# five parallel round trips.
+_query_pool = ThreadPoolExecutor(max_workers=8)
+
 class DatabaseManager:
     def __init__(self, url: str = None, key: str = None):
         """Initialize Supabase client or mock database"""
         self.url = url or os.getenv("SUPABASE_URL")
         self.key = key or os.getenv("SUPABASE_KEY")
         
-        # Store mock data if Supabase isn't available
+        # Store mock data if Supabase isn't available, with indexes so lookups
+        # don't linearly scan the whole list on every call
         self.mock_tickets = []
-        
+        self._mock_by_id = {}
+        self._mock_by_user = defaultdict(list)
+        self._mock_by_status = defaultdict(list)
+        self._mock_by_category = defaultdict(list)
+        # Parallel lists sorted ascending by creation time for O(log n) range queries
+        self._mock_times = []
+        self._mock_by_time = []
+
         if SUPABASE_AVAILABLE:
             try:
                 self.supabase: Client = create_client(self.url, self.key)
@@ -55,37 +89,87 @@ class DatabaseManager:
                 "id": f"TK-{1000 + i}", "user_id": random.randint(100, 999), "username": random.choice(usernames),
                 "issue": f"Sample issue #{i+1}", "summary": f"This is a sample ticket summary for demonstration purposes #{i+1}",
                 "category": random.choice(categories), "priority": random.choice(priorities), "sentiment": random.choice(sentiments),
-                "status": random.choice(statuses), "created_at": timestamp.isoformat()
+                "status": random.choice(statuses), "created_at": timestamp.isoformat(), "_created_at_dt": timestamp
             }
             self.mock_tickets.append(ticket)
         
         self.mock_tickets.sort(key=lambda x: x["created_at"], reverse=True)
+        for ticket in self.mock_tickets:
+            self._index_mock_ticket(ticket)
 
-    def create_ticket(self, user_id: int, username: str, issue: str, 
+    def _index_mock_ticket(self, ticket: Dict, prepend: bool = False):
+        """Add a mock ticket to the id/user/status/category and time indexes"""
+        self._mock_by_id[ticket["id"]] = ticket
+        for index, key in ((self._mock_by_user, "user_id"), (self._mock_by_status, "status"), (self._mock_by_category, "category")):
+            bucket = index[ticket[key]]
+            bucket.insert(0, ticket) if prepend else bucket.append(ticket)
+        pos = bisect.bisect_right(self._mock_times, ticket["_created_at_dt"])
+        self._mock_times.insert(pos, ticket["_created_at_dt"])
+        self._mock_by_time.insert(pos, ticket)
+
+    def invalidate_cache(self):
+        """Drop cached aggregations so the next dashboard read sees fresh data"""
+        with _stats_cache_lock:
+            _stats_cache.clear()
+
+    def create_ticket(self, user_id: int, username: str, issue: str,
                      summary: str, category: str, priority: str, sentiment: str) -> str:
         """Create a new ticket in Supabase or mock database"""
         try:
-            ticket_id = f"TK-{int(datetime.now().timestamp())}"
+            now = datetime.now()
+            ticket_id = _new_ticket_id(now)
             ticket_data = {
                 "id": ticket_id, "user_id": user_id, "username": username, "issue": issue, "summary": summary,
-                "category": category, "priority": priority, "sentiment": sentiment, "status": "open", "created_at": datetime.now().isoformat()
+                "category": category, "priority": priority, "sentiment": sentiment, "status": "open", "created_at": now.isoformat()
             }
             if SUPABASE_AVAILABLE:
                 result = self.supabase.table("tickets").insert(ticket_data).execute()
                 if result.data:
                     logger.info(f"✅ Ticket {ticket_id} created successfully")
+                    self.invalidate_cache()
                     return ticket_id
                 else:
                     logger.error("❌ Failed to create ticket - no data returned")
                     return None
             else:
+                ticket_data["_created_at_dt"] = now
                 self.mock_tickets.insert(0, ticket_data)
+                self._index_mock_ticket(ticket_data, prepend=True)
                 logger.info(f"✅ Ticket {ticket_id} created in mock database")
+                self.invalidate_cache()
                 return ticket_id
         except Exception as e:
             logger.error(f"❌ Error creating ticket: {e}")
             return None
 
+    def create_tickets(self, tickets: List[Dict]) -> List[Optional[str]]:
+        """Create a batch of tickets in one insert; returns their ids in order"""
+        try:
+            now = datetime.now()
+            rows = []
+            for spec in tickets:
+                rows.append({
+                    "id": _new_ticket_id(now), "user_id": spec["user_id"], "username": spec["username"],
+                    "issue": spec["issue"], "summary": spec["summary"], "category": spec["category"],
+                    "priority": spec["priority"], "sentiment": spec["sentiment"], "status": "open", "created_at": now.isoformat()
+                })
+            if SUPABASE_AVAILABLE:
+                result = self.supabase.table("tickets").insert(rows).execute()
+                if not result.data:
+                    logger.error("❌ Failed to create ticket batch - no data returned")
+                    return [None] * len(rows)
+            else:
+                for row in rows:
+                    row["_created_at_dt"] = now
+                    self.mock_tickets.insert(0, row)
+                    self._index_mock_ticket(row, prepend=True)
+            logger.info(f"✅ Created {len(rows)} ticket(s) in one batch")
+            self.invalidate_cache()
+            return [row["id"] for row in rows]
+        except Exception as e:
+            logger.error(f"❌ Error creating ticket batch: {e}")
+            return [None] * len(tickets)
+
     def get_ticket(self, ticket_id: str) -> Optional[Dict]:
         """Get a specific ticket by ID"""
         try:
@@ -93,7 +177,7 @@ class DatabaseManager:
                 result = self.supabase.table("tickets").select("*").eq("id", ticket_id).execute()
                 return result.data[0] if result.data else None
             else:
-                return next((ticket for ticket in self.mock_tickets if ticket["id"] == ticket_id), None)
+                return self._mock_by_id.get(ticket_id)
         except Exception as e:
             logger.error(f"❌ Error fetching ticket {ticket_id}: {e}")
             return None
@@ -108,15 +192,23 @@ class DatabaseManager:
                 result = self.supabase.table("tickets").update(update_data).eq("id", ticket_id).execute()
                 if result.data:
                     logger.info(f"✅ Ticket {ticket_id} updated to {status}")
+                    self.invalidate_cache()
                     return True
                 return False
             else:
-                for ticket in self.mock_tickets:
-                    if ticket["id"] == ticket_id:
-                        ticket.update(update_data)
-                        logger.info(f"✅ Ticket {ticket_id} updated to {status} in mock database")
-                        return True
-                return False
+                ticket = self._mock_by_id.get(ticket_id)
+                if not ticket:
+                    return False
+                old_status = ticket.get("status")
+                ticket.update(update_data)
+                if status != old_status:
+                    self._mock_by_status[old_status].remove(ticket)
+                    bucket = self._mock_by_status[status]
+                    bucket.append(ticket)
+                    bucket.sort(key=lambda t: t["created_at"], reverse=True)
+                logger.info(f"✅ Ticket {ticket_id} updated to {status} in mock database")
+                self.invalidate_cache()
+                return True
         except Exception as e:
             logger.error(f"❌ Error updating ticket {ticket_id}: {e}")
             return False
@@ -128,47 +220,84 @@ class DatabaseManager:
                 result = self.supabase.table("tickets").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
                 return result.data if result.data else []
             else:
-                return [t for t in self.mock_tickets if t["user_id"] == user_id][:limit]
+                return self._mock_by_user.get(user_id, [])[:limit]
         except Exception as e:
             logger.error(f"❌ Error fetching user tickets: {e}")
             return []
 
-    def get_all_tickets(self, status: str = None, limit: int = 100) -> List[Dict]:
-        """Get all tickets, optionally filtered by status"""
+    def get_all_tickets(self, status: str = None, limit: int = 100, columns: str = "*") -> List[Dict]:
+        """Get all tickets, optionally filtered by status and projected to specific columns"""
         try:
             if SUPABASE_AVAILABLE:
-                query = self.supabase.table("tickets").select("*")
+                query = self.supabase.table("tickets").select(columns)
                 if status: query = query.eq("status", status)
                 result = query.order("created_at", desc=True).limit(limit).execute()
                 return result.data if result.data else []
             else:
-                filtered = self.mock_tickets
-                if status: filtered = [t for t in filtered if t["status"] == status]
+                filtered = self._mock_by_status.get(status, []) if status else self.mock_tickets
                 return filtered[:limit]
         except Exception as e:
             logger.error(f"❌ Error fetching all tickets: {e}")
             return []
 
+    def count_tickets(self, status: str = None) -> int:
+        """Count tickets via a head request - the server returns the count, no rows"""
+        try:
+            if SUPABASE_AVAILABLE:
+                query = self.supabase.table("tickets").select("id", count="exact")
+                if status: query = query.eq("status", status)
+                result = query.limit(1).execute()
+                return result.count or 0
+            return len(self._mock_by_status.get(status, [])) if status else len(self.mock_tickets)
+        except Exception as e:
+            logger.error(f"❌ Error counting tickets: {e}")
+            return 0
+
+    @cached(_stats_cache, key=partial(hashkey, "stats"), lock=_stats_cache_lock)
     def get_ticket_stats(self) -> Dict:
         """Get ticket statistics for dashboard"""
         stats = {"total": 0, "open": 0, "resolved": 0, "forwarded": 0}
         try:
-            all_tickets = self.get_all_tickets(limit=10000) # Get all for accurate stats
-            stats["total"] = len(all_tickets)
-            for ticket in all_tickets:
-                if ticket.get("status") in stats:
-                    stats[ticket["status"]] += 1
+            if SUPABASE_AVAILABLE:
+                try:
+                    result = self.supabase.from_("v_ticket_status_counts").select("*").execute()
+                    for row in (result.data or []):
+                        stats["total"] += row["count"]
+                        if row["status"] in stats:
+                            stats[row["status"]] = row["count"]
+                except Exception as e:
+                    # View missing: head-count per status rather than pulling rows
+                    logger.error(f"❌ Error reading status counts view, falling back to head counts: {e}")
+                    stats["total"] = self.count_tickets()
+                    for status in ("open", "resolved", "forwarded"):
+                        stats[status] = self.count_tickets(status)
+            else:
+                stats["total"] = len(self.mock_tickets)
+                for ticket in self.mock_tickets:
+                    if ticket.get("status") in stats:
+                        stats[ticket["status"]] += 1
             return stats
         except Exception as e:
             logger.error(f"❌ Error fetching ticket stats: {e}")
             return stats
 
+    @cached(_stats_cache, key=partial(hashkey, "category_dist"), lock=_stats_cache_lock)
     def get_category_distribution(self) -> Dict:
         """Get ticket distribution by category"""
         categories = {}
         try:
-            all_tickets = self.get_all_tickets(limit=10000)
-            for ticket in all_tickets:
+            if SUPABASE_AVAILABLE:
+                try:
+                    result = self.supabase.from_("v_ticket_category_counts").select("*").execute()
+                    return {row["category"]: row["count"] for row in (result.data or [])}
+                except Exception as e:
+                    # View missing: project just the category column and count here
+                    logger.error(f"❌ Error reading category counts view, falling back to projected rows: {e}")
+                    for ticket in self.get_all_tickets(limit=10000, columns="category"):
+                        category = ticket.get("category", "Unknown")
+                        categories[category] = categories.get(category, 0) + 1
+                    return categories
+            for ticket in self.mock_tickets:
                 category = ticket.get("category", "Unknown")
                 categories[category] = categories.get(category, 0) + 1
             return categories
@@ -176,12 +305,23 @@ class DatabaseManager:
             logger.error(f"❌ Error fetching category distribution: {e}")
             return {}
 
+    @cached(_stats_cache, key=partial(hashkey, "priority_dist"), lock=_stats_cache_lock)
     def get_priority_distribution(self) -> Dict:
         """Get ticket distribution by priority"""
         priorities = {}
         try:
-            all_tickets = self.get_all_tickets(limit=10000)
-            for ticket in all_tickets:
+            if SUPABASE_AVAILABLE:
+                try:
+                    result = self.supabase.from_("v_ticket_priority_counts").select("*").execute()
+                    return {row["priority"]: row["count"] for row in (result.data or [])}
+                except Exception as e:
+                    # View missing: project just the priority column and count here
+                    logger.error(f"❌ Error reading priority counts view, falling back to projected rows: {e}")
+                    for ticket in self.get_all_tickets(limit=10000, columns="priority"):
+                        priority = ticket.get("priority", "Medium")
+                        priorities[priority] = priorities.get(priority, 0) + 1
+                    return priorities
+            for ticket in self.mock_tickets:
                 priority = ticket.get("priority", "Medium")
                 priorities[priority] = priorities.get(priority, 0) + 1
             return priorities
@@ -189,11 +329,11 @@ class DatabaseManager:
             logger.error(f"❌ Error fetching priority distribution: {e}")
             return {}
 
-    def search_tickets(self, search_term: str, limit: int = 50) -> List[Dict]:
-        """Search tickets by content"""
+    def search_tickets(self, search_term: str, limit: int = 50, columns: str = "*") -> List[Dict]:
+        """Search tickets by content (served by the trigram indexes in sql/search_index.sql)"""
         try:
             if SUPABASE_AVAILABLE:
-                result = self.supabase.table("tickets").select("*").or_(f"issue.ilike.%{search_term}%,summary.ilike.%{search_term}%,id.ilike.%{search_term}%").order("created_at", desc=True).limit(limit).execute()
+                result = self.supabase.table("tickets").select(columns).or_(f"issue.ilike.%{search_term}%,summary.ilike.%{search_term}%,id.ilike.%{search_term}%").order("created_at", desc=True).limit(limit).execute()
                 return result.data if result.data else []
             else:
                 search_term = search_term.lower()
@@ -210,14 +350,33 @@ class DatabaseManager:
                 return result.data if result.data else []
             else:
                 start, end = datetime.fromisoformat(start_date.replace('Z', '+00:00')), datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                return [t for t in self.mock_tickets if start <= datetime.fromisoformat(t.get("created_at", "").replace('Z', '+00:00')) <= end]
+                lo, hi = bisect.bisect_left(self._mock_times, start), bisect.bisect_right(self._mock_times, end)
+                return self._mock_by_time[lo:hi][::-1]  # newest first, matching the Supabase path
         except Exception as e:
             logger.error(f"❌ Error fetching tickets by date range: {e}")
             return []
 
     def assign_ticket(self, ticket_id: str, assigned_to: str) -> bool:
         """Assign ticket to an agent"""
-        return self.update_ticket_status(ticket_id, self.get_ticket(ticket_id)['status'], resolution=self.get_ticket(ticket_id).get('resolution'))
+        try:
+            if SUPABASE_AVAILABLE:
+                result = self.supabase.table("tickets").update({"assigned_to": assigned_to}).eq("id", ticket_id).execute()
+                if result.data:
+                    logger.info(f"✅ Ticket {ticket_id} assigned to {assigned_to}")
+                    self.invalidate_cache()
+                    return True
+                return False
+            else:
+                ticket = self._mock_by_id.get(ticket_id)
+                if not ticket:
+                    return False
+                ticket["assigned_to"] = assigned_to
+                logger.info(f"✅ Ticket {ticket_id} assigned to {assigned_to} in mock database")
+                self.invalidate_cache()
+                return True
+        except Exception as e:
+            logger.error(f"❌ Error assigning ticket {ticket_id}: {e}")
+            return False
 
     def get_recent_activity(self, limit: int = 20) -> List[Dict]:
         """Get recent ticket activity"""
@@ -231,11 +390,56 @@ class DatabaseManager:
             logger.error(f"❌ Error fetching recent activity: {e}")
             return []
 
+    # --- Dashboard snapshot: everything the initial render needs in one round trip ---
+    def get_dashboard_snapshot(self, days: int = 7) -> Dict:
+        """Get stats, distributions, daily volume and recent tickets in a single call"""
+        if SUPABASE_AVAILABLE:
+            try:
+                result = self.supabase.rpc("dashboard_snapshot", {"days": days}).execute()
+                if result.data:
+                    return result.data
+            except Exception as e:
+                logger.error(f"❌ Error fetching dashboard snapshot, falling back to individual queries: {e}")
+        return self._build_snapshot_fallback(days)
+
+    def _build_snapshot_fallback(self, days: int) -> Dict:
+        """Assemble the snapshot payload from individual queries (mock mode or missing RPC)"""
+        # The five queries are independent, so fan them out and wait for the
+        # slowest instead of paying each round trip in sequence.
+        futures = {
+            "stats": _query_pool.submit(self.get_ticket_stats),
+            "by_category": _query_pool.submit(self.get_category_distribution),
+            "by_priority": _query_pool.submit(self.get_priority_distribution),
+            "daily_volume": _query_pool.submit(self.get_ticket_daily_counts, days),
+            "recent": _query_pool.submit(self.get_all_tickets, None, 200),
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+    def get_ticket_daily_counts(self, days: int = 7) -> List[Dict]:
+        """Get per-day ticket counts for the last N days via the server-side histogram"""
+        if SUPABASE_AVAILABLE:
+            try:
+                result = self.supabase.rpc("ticket_daily_counts", {"days": days}).execute()
+                if result.data is not None:
+                    return [{"day": row["day"], "count": row["cnt"]} for row in result.data]
+            except Exception as e:
+                logger.error(f"❌ Error fetching daily counts, falling back to raw tickets: {e}")
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        volume = {}
+        for ticket in self.get_tickets_by_date_range(start_date.isoformat(), end_date.isoformat()):
+            day = ticket.get("created_at", "")[:10]
+            if day: volume[day] = volume.get(day, 0) + 1
+        # Zero-fill the full range so quiet days show as dips, not gaps
+        all_days = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+        return [{"day": day, "count": volume.get(day, 0)} for day in all_days]
+
     # --- NEW METHOD 1: For Root Cause Analysis Dropdown ---
+    @cached(_stats_cache, key=partial(hashkey, "categories"), lock=_stats_cache_lock)
     def get_all_categories(self) -> List[str]:
         """Get a list of all unique ticket categories."""
         try:
-            all_tickets = self.get_all_tickets(limit=10000)
+            all_tickets = self.get_all_tickets(limit=10000, columns="category")
             return sorted(list(set(t['category'] for t in all_tickets if 'category' in t)))
         except Exception as e:
             logger.error(f"❌ Error fetching unique categories: {e}")
@@ -254,7 +458,7 @@ class DatabaseManager:
                          .execute())
                 return [t['summary'] for t in result.data] if result.data else []
             else:
-                return [t['summary'] for t in self.mock_tickets if t.get('category') == category][:limit]
+                return [t['summary'] for t in self._mock_by_category.get(category, [])[:limit]]
         except Exception as e:
             logger.error(f"❌ Error fetching summaries by category: {e}")
             return []
@@ -1,11 +1,15 @@
 # --- START OF FILE helphub1.py (Corrected for Asyncio) ---
 
+import io
 import os
+import hashlib
 import logging
-import requests
-import json
-import tempfile
+import httpx
+import orjson
 import asyncio
+import time
+from collections import OrderedDict
+from cachetools import TTLCache
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -18,16 +22,27 @@ from telegram.ext import (
 )
 
 # Imports for the API server
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+import msgspec
 import uvicorn
 
 from database_manager import db_manager
 from dotenv import load_dotenv
 load_dotenv()
 
-# Define a data model for our API endpoint
-class Notification(BaseModel):
+# Use uvloop for the shared event loop when available (Linux/macOS) - it cuts
+# per-callback overhead for the bot's polling, Groq calls and the API server
+try:
+    import uvloop
+    uvloop.install()
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# Define a data model for our API endpoint (msgspec decodes + validates the
+# hot notify path considerably faster than Pydantic for small bodies)
+class Notification(msgspec.Struct):
     user_id: int
     message: str
 
@@ -35,6 +50,10 @@ class Notification(BaseModel):
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
+# Build the Groq auth headers once instead of per request
+HEADERS_AUTH = {"Authorization": f"Bearer {GROQ_API_KEY}"}
+HEADERS_JSON = {**HEADERS_AUTH, "Content-Type": "application/json"}
+
 # Set up logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -45,12 +64,21 @@ logger = logging.getLogger(__name__)
 # We will define the bot application globally so the API can access it
 bot_app: Application = None
 
+# Shared async HTTP client for Groq calls - created in main(), closed on
+# shutdown. Keep-alive means concurrent users share warm connections instead
+# of blocking the event loop inside requests.post.
+GROQ_CLIENT: httpx.AsyncClient = None
+
 # Define the FastAPI app and its endpoint
-api_app = FastAPI()
+api_app = FastAPI(default_response_class=ORJSONResponse)
 
 @api_app.post("/notify_user")
-async def notify_user(notification: Notification):
+async def notify_user(request: Request):
     """API endpoint to send a message to a user from the dashboard."""
+    try:
+        notification = msgspec.json.decode(await request.body(), type=Notification)
+    except msgspec.DecodeError as e:  # parent of ValidationError; also covers malformed JSON
+        return {"status": "error", "message": str(e)}
     if not bot_app:
         logger.error("API call received but bot is not initialized.")
         return {"status": "error", "message": "Bot not initialized"}
@@ -60,96 +88,306 @@ async def notify_user(notification: Notification):
             text=notification.message,
             parse_mode='Markdown'
         )
-        logger.info(f"✅ Sent dashboard notification to user {notification.user_id}")
+        logger.info("✅ Sent dashboard notification to user %s", notification.user_id)
         return {"status": "success"}
     except Exception as e:
-        logger.error(f"❌ Failed to send dashboard notification to {notification.user_id}: {e}")
+        logger.error("❌ Failed to send dashboard notification to %s: %s", notification.user_id, e)
         return {"status": "error", "message": str(e)}
 
+# Analysis cache: exact SHA256 hits for repeated text, plus a token-set
+# similarity match so near-duplicate complaints ("my payment failed" /
+# "payment didn't go through, help") reuse a prior analysis instead of paying
+# seconds of Llama-70B latency and a billable Groq call.
+class LLMCache:
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600, similarity: float = 0.9):
+        self.max_entries, self.ttl, self.similarity = max_entries, ttl, similarity
+        self._entries = OrderedDict()  # sha256 -> (token set, analysis, timestamp)
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.strip().lower().encode()).hexdigest()
+
+    @staticmethod
+    def _tokens(text: str) -> frozenset:
+        return frozenset(text.lower().split())
+
+    def get(self, text: str) -> dict:
+        now = time.time()
+        entry = self._entries.get(self._key(text))
+        if entry and now - entry[2] < self.ttl:
+            self._entries.move_to_end(self._key(text))
+            self.hits += 1
+            return entry[1]
+        tokens = self._tokens(text)
+        if tokens:
+            for other_tokens, analysis, ts in self._entries.values():
+                if now - ts < self.ttl and len(tokens & other_tokens) / len(tokens | other_tokens) >= self.similarity:
+                    self.hits += 1
+                    return analysis
+        self.misses += 1
+        return None
+
+    def put(self, text: str, analysis: dict):
+        self._entries[self._key(text)] = (self._tokens(text), analysis, time.time())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+ANALYSIS_CACHE = LLMCache()
+
+# Cap in-flight Groq requests so a burst of users degrades to queueing here
+# instead of tripping the API's rate limiter
+GROQ_SEM = asyncio.Semaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", "16")))
+
+@api_app.get("/cache_stats")
+async def cache_stats():
+    """Hit-rate visibility for the analysis cache."""
+    return ANALYSIS_CACHE.stats()
+
 # Bot helper functions (transcription and analysis)
-def transcribe_audio_with_groq(audio_data: bytes) -> str:
+async def transcribe_audio_with_groq(audio_data: bytes) -> str:
+    if not GROQ_API_KEY:
+        return "❌ Transcription failed: GROQ_API_KEY not configured"
     url = "https://api.groq.com/openai/v1/audio/transcriptions"
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}"}
-    with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as temp_file:
-        temp_file.write(audio_data)
-        temp_path = temp_file.name
     try:
-        with open(temp_path, 'rb') as audio_file:
-            files = {'file': ('audio.ogg', audio_file, 'audio/ogg'), 'model': (None, 'whisper-large-v3'), 'response_format': (None, 'json')}
-            response = requests.post(url, headers=headers, files=files, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            return result.get('text', 'Could not transcribe audio')
+        # The voice bytes are already in memory; upload them directly instead
+        # of bouncing through a temp file on disk
+        files = {'file': ('audio.ogg', audio_data, 'audio/ogg'), 'model': (None, 'whisper-large-v3'), 'response_format': (None, 'json')}
+        async with GROQ_SEM:
+            response = await GROQ_CLIENT.post(url, headers=HEADERS_AUTH, files=files)
+        response.raise_for_status()
+        result = response.json()
+        return result.get('text', 'Could not transcribe audio')
     except Exception as e:
-        logger.error(f"Transcription error: {e}")
+        logger.error("Transcription error: %s", e)
         return f"❌ Transcription failed: {str(e)}"
-    finally:
-        try: os.unlink(temp_path)
-        except: pass
 
-def analyze_issue_with_llama(text: str) -> dict:
+# Static instructions live in a byte-identical system message so Groq can
+# reuse its cached prompt prefix across requests; only the issues vary.
+ANALYSIS_SYSTEM_PROMPT = ('Analyze the customer service issues provided by the user and return JSON of the form '
+                          '{"analyses": [{"summary": "...", "category": "...", "priority": "...", "sentiment": "...", "suggested_resolution": "...", "auto_resolvable": true/false}]} '
+                          'with exactly one object per issue, in order.')
+
+def extract_first_json_object(s: str) -> str:
+    """Return the first balanced {...} slice of s, brace/string aware.
+
+    Slicing from the first "{" to the last "}" breaks when the model wraps
+    the JSON in prose that itself contains braces; a single linear pass that
+    tracks string and escape state does not.
+    """
+    depth, start, in_string, escaped = 0, -1, False, False
+    for i, ch in enumerate(s):
+        if in_string:
+            if escaped: escaped = False
+            elif ch == "\\": escaped = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch == "{":
+            if depth == 0: start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0: return s[start:i + 1]
+    return ""
+
+# Built once; the handlers only differ in icon and issue body
+TICKET_TEMPLATE = ("🎫 **Ticket Created: {ticket_id}**\n\n{icon} _{body}_\n\n📋 **Summary:** {summary}\n"
+                   "• **Category:** {category}\n• **Priority:** {priority}\n• **Sentiment:** {sentiment}\n\n"
+                   "💡 **Resolution:** {resolution}")
+
+def _default_analysis(text: str) -> dict:
+    return {"summary": text[:100], "category": "General", "priority": "Medium", "sentiment": "Neutral", "suggested_resolution": "Needs human attention", "auto_resolvable": False}
+
+async def _analyze_issue_batch(texts: list) -> list:
+    """Analyze one or more issues in a single Groq completion request."""
     url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-    prompt = f'Analyze this customer service issue and provide structured JSON:\nIssue: {text}\n{{"summary": "...", "category": "...", "priority": "...", "sentiment": "...", "suggested_resolution": "...", "auto_resolvable": true/false}}'
-    data = {"model": "llama3-70b-8192", "messages": [{"role": "user", "content": prompt}], "temperature": 0.3}
+    numbered = "\n".join(f"[{i+1}] {text}" for i, text in enumerate(texts))
+    data = {"model": "llama3-70b-8192", "messages": [{"role": "system", "content": ANALYSIS_SYSTEM_PROMPT}, {"role": "user", "content": numbered}], "temperature": 0.3, "response_format": {"type": "json_object"}}
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        async with GROQ_SEM:
+            response = await GROQ_CLIENT.post(url, headers=HEADERS_JSON, content=orjson.dumps(data))
         response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
-        return json.loads(content[content.find("{"):content.rfind("}")+1])
+        content = orjson.loads(response.content)['choices'][0]['message']['content']
+        analyses = orjson.loads(extract_first_json_object(content)).get("analyses", [])
+        analyses += [None] * (len(texts) - len(analyses))
+        results = []
+        for text, analysis in zip(texts, analyses):
+            if isinstance(analysis, dict) and "summary" in analysis:
+                ANALYSIS_CACHE.put(text, analysis)
+                results.append(analysis)
+            else:
+                results.append(_default_analysis(text))
+        return results
     except Exception as e:
-        logger.error(f"LLM error: {e}")
-        return {"summary": text[:100], "category": "General", "priority": "Medium", "sentiment": "Neutral", "suggested_resolution": "Needs human attention", "auto_resolvable": False}
+        logger.error("LLM error: %s", e)
+        return [_default_analysis(text) for text in texts]
+
+class LLMBatcher:
+    """Coalesce concurrent analysis requests into one Groq completion.
+
+    Accumulates up to MAX_BATCH texts or WINDOW seconds, then sends a single
+    request asking for one analysis per issue - a burst of N tickets costs one
+    round trip of HTTP and prompt overhead instead of N.
+    """
+    MAX_BATCH = 8
+    WINDOW = 0.05
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, text: str) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.WINDOW
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            results = await _analyze_issue_batch([text for text, _ in batch])
+            for (_, future), analysis in zip(batch, results):
+                if not future.done(): future.set_result(analysis)
+
+LLM_BATCHER = LLMBatcher()
+
+class TicketWriter:
+    """Batch ticket creation behind an async queue.
+
+    Handlers enqueue a ticket spec and await its id; a background task drains
+    up to MAX_BATCH specs (or waits WINDOW seconds) and writes them with one
+    multi-row insert, so a burst of tickets costs one DB round trip.
+    """
+    MAX_BATCH = 32
+    WINDOW = 0.02
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, spec: dict) -> str:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((spec, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.WINDOW
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            ticket_ids = await asyncio.to_thread(db_manager.create_tickets, [spec for spec, _ in batch])
+            for (_, future), ticket_id in zip(batch, ticket_ids):
+                if not future.done(): future.set_result(ticket_id)
+
+TICKET_WRITER = TicketWriter()
+
+async def analyze_issue_with_llama(text: str) -> dict:
+    if not GROQ_API_KEY:
+        logger.error("GROQ_API_KEY not configured, returning default analysis")
+        return _default_analysis(text)
+    cached = ANALYSIS_CACHE.get(text)
+    if cached:
+        return cached
+    return await LLM_BATCHER.submit(text)
+
+# Short-lived ticket cache: callback taps on the same ticket (status checks,
+# double-clicks) are common within a minute of creation
+TICKET_CACHE = TTLCache(maxsize=1024, ttl=60)
+
+# Inline keyboard labels are constant; only the callback_data varies per ticket
+_RESOLVE_LABEL = "✅ Mark as Resolved"
+_FORWARD_LABEL = "👨‍💼 Forward to Human"
+_STATUS_LABEL = "ℹ️ Ticket Status"
+
+def build_ticket_keyboard(ticket_id: str, auto_resolvable: bool) -> InlineKeyboardMarkup:
+    buttons = [[InlineKeyboardButton(_RESOLVE_LABEL, callback_data=f"resolve_{ticket_id}")]] if auto_resolvable else []
+    buttons.append([InlineKeyboardButton(_FORWARD_LABEL, callback_data=f"forward_{ticket_id}"), InlineKeyboardButton(_STATUS_LABEL, callback_data=f"status_{ticket_id}")])
+    return InlineKeyboardMarkup(buttons)
 
 # Telegram Bot Handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔥 **Welcome to HelpHub!**\nSend a voice or text message describing your issue. I’ll create a support ticket, analyze it, and guide you forward.", parse_mode='Markdown')
 
+def get_display_name(user, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Resolve and memoize the user's display name in per-user bot data."""
+    name = context.user_data.get("display_name")
+    if not name:
+        name = user.username or user.first_name
+        context.user_data["display_name"] = name
+    return name
+
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user, msg = update.effective_user, await update.message.reply_text("🎧 Processing your voice message...")
     try:
         voice_file = await update.message.voice.get_file()
-        await msg.edit_text("🎧 Transcribing audio...")
-        transcript = transcribe_audio_with_groq(await voice_file.download_as_bytearray())
+        buf = io.BytesIO()
+        await asyncio.gather(msg.edit_text("🎧 Transcribing audio..."), voice_file.download_to_memory(buf))
+        transcript = await transcribe_audio_with_groq(buf.getvalue())
         if transcript.startswith("❌"):
             await msg.edit_text(transcript); return
-        await msg.edit_text("🤖 Analyzing your issue...")
-        analysis = analyze_issue_with_llama(transcript)
-        ticket_id = db_manager.create_ticket(user.id, user.username or user.first_name, transcript, analysis['summary'], analysis['category'], analysis['priority'], analysis['sentiment'])
+        _, analysis = await asyncio.gather(msg.edit_text("🤖 Analyzing your issue..."), analyze_issue_with_llama(transcript))
+        ticket_id = await TICKET_WRITER.submit({"user_id": user.id, "username": get_display_name(user, context), "issue": transcript, "summary": analysis['summary'], "category": analysis['category'], "priority": analysis['priority'], "sentiment": analysis['sentiment']})
         if not ticket_id:
             await msg.edit_text("❌ Failed to create ticket."); return
-        response = f"🎫 **Ticket Created: {ticket_id}**\n\n🎧 _{transcript}_\n\n📋 **Summary:** {analysis['summary']}\n• **Category:** {analysis['category']}\n• **Priority:** {analysis['priority']}\n• **Sentiment:** {analysis['sentiment']}\n\n💡 **Resolution:** {analysis['suggested_resolution']}"
-        buttons = [[InlineKeyboardButton("✅ Mark as Resolved", callback_data=f"resolve_{ticket_id}")]] if analysis['auto_resolvable'] else []
-        buttons.append([InlineKeyboardButton("👨‍💼 Forward to Human", callback_data=f"forward_{ticket_id}"), InlineKeyboardButton("ℹ️ Ticket Status", callback_data=f"status_{ticket_id}")])
-        await msg.edit_text(response, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(buttons))
+        response = TICKET_TEMPLATE.format_map({**analysis, "ticket_id": ticket_id, "icon": "🎧", "body": transcript, "resolution": analysis['suggested_resolution']})
+        await msg.edit_text(response, parse_mode='Markdown', reply_markup=build_ticket_keyboard(ticket_id, analysis['auto_resolvable']))
     except Exception as e:
-        logger.error(f"Voice error: {e}"); await msg.edit_text(f"❌ Error: {str(e)}")
+        logger.error("Voice error: %s", e); await msg.edit_text(f"❌ Error: {str(e)}")
 
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user, user_text, msg = update.effective_user, update.message.text, await update.message.reply_text("🤖 Analyzing your issue...")
+    user, user_text = update.effective_user, update.message.text
+    analysis_task = asyncio.create_task(analyze_issue_with_llama(user_text))
+    msg = await update.message.reply_text("🤖 Analyzing your issue...")
     try:
-        analysis = analyze_issue_with_llama(user_text)
-        ticket_id = db_manager.create_ticket(user.id, user.username or user.first_name, user_text, analysis['summary'], analysis['category'], analysis['priority'], analysis['sentiment'])
+        analysis = await analysis_task
+        ticket_id = await TICKET_WRITER.submit({"user_id": user.id, "username": get_display_name(user, context), "issue": user_text, "summary": analysis['summary'], "category": analysis['category'], "priority": analysis['priority'], "sentiment": analysis['sentiment']})
         if not ticket_id:
             await msg.edit_text("❌ Failed to create ticket."); return
-        response = f"🎫 **Ticket Created: {ticket_id}**\n\n💬 _{user_text}_\n\n📋 **Summary:** {analysis['summary']}\n• **Category:** {analysis['category']}\n• **Priority:** {analysis['priority']}\n• **Sentiment:** {analysis['sentiment']}\n\n💡 **Resolution:** {analysis['suggested_resolution']}"
-        buttons = [[InlineKeyboardButton("✅ Mark as Resolved", callback_data=f"resolve_{ticket_id}")]] if analysis['auto_resolvable'] else []
-        buttons.append([InlineKeyboardButton("👨‍💼 Forward to Human", callback_data=f"forward_{ticket_id}"), InlineKeyboardButton("ℹ️ Ticket Status", callback_data=f"status_{ticket_id}")])
-        await msg.edit_text(response, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(buttons))
+        response = TICKET_TEMPLATE.format_map({**analysis, "ticket_id": ticket_id, "icon": "💬", "body": user_text, "resolution": analysis['suggested_resolution']})
+        await msg.edit_text(response, parse_mode='Markdown', reply_markup=build_ticket_keyboard(ticket_id, analysis['auto_resolvable']))
     except Exception as e:
-        logger.error(f"Text error: {e}"); await msg.edit_text(f"❌ Error: {str(e)}")
+        logger.error("Text error: %s", e); await msg.edit_text(f"❌ Error: {str(e)}")
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     action, ticket_id = query.data.split('_', 1)
-    ticket = db_manager.get_ticket(ticket_id)
+    ticket = TICKET_CACHE.get(ticket_id)
+    if ticket is None:
+        ticket = await asyncio.to_thread(db_manager.get_ticket, ticket_id)
+        if ticket: TICKET_CACHE[ticket_id] = ticket
     if not ticket: await query.edit_message_text("❌ Ticket not found."); return
     if action == "resolve":
-        db_manager.update_ticket_status(ticket_id, "resolved", "Auto-resolved by customer")
+        TICKET_CACHE.pop(ticket_id, None)
+        await asyncio.to_thread(db_manager.update_ticket_status, ticket_id, "resolved", "Auto-resolved by customer")
         await query.edit_message_text(f"✅ Ticket {ticket_id} marked as resolved.", parse_mode='Markdown')
     elif action == "forward":
-        db_manager.update_ticket_status(ticket_id, "forwarded")
+        TICKET_CACHE.pop(ticket_id, None)
+        await asyncio.to_thread(db_manager.update_ticket_status, ticket_id, "forwarded")
         await query.edit_message_text(f"🔄 Ticket {ticket_id} forwarded to human support.", parse_mode='Markdown')
     elif action == "status":
         await query.edit_message_text(f"📋 **Ticket Status: {ticket_id}**\n\n• **Status:** {ticket['status'].title()}\n• **Category:** {ticket['category']}\n• **Priority:** {ticket['priority']}\n• **Created:** {ticket['created_at'][:19]}\n• **Summary:** {ticket['summary']}", parse_mode='Markdown')
@@ -158,7 +396,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("**HelpHub Commands:**\n/start - Start bot\n/help - Show help\n/mystatus - Your recent tickets", parse_mode='Markdown')
 
 async def my_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user, tickets = update.effective_user, db_manager.get_user_tickets(user.id)
+    user = update.effective_user
+    tickets = await asyncio.to_thread(db_manager.get_user_tickets, user.id)
     if not tickets: await update.message.reply_text("📋 You don't have any tickets yet."); return
     msg = "📋 **Your Recent Tickets:**\n\n"
     status_icons = {"open": "🟡", "resolved": "✅", "forwarded": "🔄"}
@@ -176,7 +415,10 @@ async def run_bot():
     # The 'async with' block handles graceful startup and shutdown
     async with bot_app:
         await bot_app.start()
-        await bot_app.updater.start_polling(drop_pending_updates=True)
+        # Clear any stale webhook and backlog once up front, then poll only
+        # the update types we handle - Telegram skips serializing the rest
+        await bot_app.bot.delete_webhook(drop_pending_updates=True)
+        await bot_app.updater.start_polling(drop_pending_updates=False, allowed_updates=["message", "callback_query"])
         logger.info("Bot has started polling...")
         
         # Keep the bot running until we receive a signal to stop
@@ -189,8 +431,13 @@ async def run_bot():
 
 async def main():
     """Sets up and runs the Bot and API server concurrently."""
-    global bot_app
-    
+    global bot_app, GROQ_CLIENT
+
+    # Shared Groq client: keep-alive connection pool reused by every handler
+    GROQ_CLIENT = httpx.AsyncClient(http2=True, timeout=30.0, limits=httpx.Limits(max_keepalive_connections=20, max_connections=50))
+    LLM_BATCHER.start()
+    TICKET_WRITER.start()
+
     # Set up the Telegram bot application
     bot_app = Application.builder().token(TELEGRAM_TOKEN).build()
     bot_app.add_handler(CommandHandler("start", start))
@@ -201,7 +448,7 @@ async def main():
     bot_app.add_handler(CallbackQueryHandler(handle_callback))
     
     # Set up the Uvicorn server configuration for our API
-    api_config = uvicorn.Config(api_app, host="127.0.0.1", port=8000, log_level="info")
+    api_config = uvicorn.Config(api_app, host="127.0.0.1", port=8000, log_level="warning", access_log=False, http="httptools", limit_concurrency=256, loop="uvloop" if UVLOOP_AVAILABLE else "asyncio")
     api_server = uvicorn.Server(api_config)
     
     # Run the bot and the API server concurrently
@@ -213,6 +460,8 @@ async def main():
         )
     except (KeyboardInterrupt, SystemExit):
         logger.info("🛑 Shutting down application...")
+    finally:
+        await GROQ_CLIENT.aclose()
 
 if __name__ == "__main__":
     try:
@@ -223,5 +472,5 @@ if __name__ == "__main__":
         else:
             raise
     except Exception as e:
-        logger.error(f"❌ Application failed to start: {e}")
+        logger.error("❌ Application failed to start: %s", e)
 # --- END OF FILE helphub1.py ---
\ No newline at end of file
@@ -0,0 +1,13 @@
+-- Aggregation views for HelpHub.
+-- Run this in the Supabase SQL editor after creating the `tickets` table.
+-- The dashboard reads these instead of pulling every row and counting in
+-- Python, so each query transfers O(cardinality) rows instead of O(rows).
+
+CREATE OR REPLACE VIEW v_ticket_status_counts AS
+SELECT status, count(*)::int AS count FROM tickets GROUP BY status;
+
+CREATE OR REPLACE VIEW v_ticket_category_counts AS
+SELECT category, count(*)::int AS count FROM tickets GROUP BY category;
+
+CREATE OR REPLACE VIEW v_ticket_priority_counts AS
+SELECT priority, count(*)::int AS count FROM tickets GROUP BY priority;
@@ -0,0 +1,39 @@
+-- Dashboard snapshot function for HelpHub.
+-- Run this in the Supabase SQL editor after creating the `tickets` table.
+-- Returns everything the dashboard needs for its initial render in one call,
+-- so the UI makes a single RPC instead of five full-table scans.
+
+CREATE OR REPLACE FUNCTION dashboard_snapshot(days int DEFAULT 7)
+RETURNS json AS $$
+SELECT json_build_object(
+    'stats', (
+        SELECT json_build_object(
+            'total', count(*),
+            'open', count(*) FILTER (WHERE status = 'open'),
+            'resolved', count(*) FILTER (WHERE status = 'resolved'),
+            'forwarded', count(*) FILTER (WHERE status = 'forwarded')
+        ) FROM tickets
+    ),
+    'by_category', (
+        SELECT coalesce(json_object_agg(category, cnt), '{}'::json)
+        FROM (SELECT category, count(*) AS cnt FROM tickets GROUP BY category) c
+    ),
+    'by_priority', (
+        SELECT coalesce(json_object_agg(priority, cnt), '{}'::json)
+        FROM (SELECT priority, count(*) AS cnt FROM tickets GROUP BY priority) p
+    ),
+    'daily_volume', (
+        SELECT coalesce(json_agg(json_build_object('day', day, 'count', cnt) ORDER BY day), '[]'::json)
+        FROM (
+            SELECT date_trunc('day', created_at)::date AS day, count(*) AS cnt
+            FROM tickets
+            WHERE created_at > now() - (days || ' days')::interval
+            GROUP BY 1
+        ) v
+    ),
+    'recent', (
+        SELECT coalesce(json_agg(t), '[]'::json)
+        FROM (SELECT * FROM tickets ORDER BY created_at DESC LIMIT 200) t
+    )
+);
+$$ LANGUAGE sql STABLE;
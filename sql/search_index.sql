@@ -0,0 +1,11 @@
+-- Trigram indexes for HelpHub ticket search.
+-- Run this in the Supabase SQL editor after creating the `tickets` table.
+-- search_tickets issues `ilike '%term%'` across these three columns; without
+-- pg_trgm each search is a sequential scan, with it each OR arm becomes an
+-- index seek that stays flat as the table grows.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS tickets_issue_trgm ON tickets USING gin (issue gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS tickets_summary_trgm ON tickets USING gin (summary gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS tickets_id_trgm ON tickets USING gin (id gin_trgm_ops);
@@ -0,0 +1,16 @@
+-- Daily ticket histogram for HelpHub.
+-- Run this in the Supabase SQL editor after creating the `tickets` table.
+-- Lets the dashboard fetch <=N (day, count) rows on every timeframe switch
+-- instead of every raw ticket in the window. Left-joining generate_series
+-- keeps quiet days in the output as zeros so the volume line dips instead
+-- of interpolating across them.
+
+CREATE OR REPLACE FUNCTION ticket_daily_counts(days int DEFAULT 7)
+RETURNS TABLE(day date, cnt int) AS $$
+    SELECT d.day::date, count(t.created_at)::int
+    -- days + 1 buckets (inclusive range), matching the Python fallback
+    FROM generate_series(now() - (days || ' days')::interval, now(), '1 day') AS d(day)
+    LEFT JOIN tickets t ON date_trunc('day', t.created_at) = date_trunc('day', d.day)
+        AND t.created_at > now() - (days || ' days')::interval
+    GROUP BY 1 ORDER BY 1
+$$ LANGUAGE sql STABLE;